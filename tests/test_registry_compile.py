@@ -0,0 +1,84 @@
+# Regression tests for tools/registry_compile.py
+# Run: python -m pytest tests/test_registry_compile.py
+import importlib.util
+import json
+import os
+import pathlib
+import stat
+
+import pytest
+
+TOOL = pathlib.Path(__file__).resolve().parent.parent / "tools" / "registry_compile.py"
+
+_spec = importlib.util.spec_from_file_location("registry_compile", TOOL)
+rc = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(rc)
+
+
+def card(md):
+    cards = rc.compile_cards(md)
+    assert len(cards) == 1
+    return cards[0]
+
+
+def test_nested_bullet_after_colon_only_line():
+    c = card("## The Star\n- App Pulls: atelier\n- Correspondences:\n  - Ray: violet\n")
+    assert c["ray"] == "violet"
+    assert c["freq"] == 963.0
+
+
+def test_empty_placeholder_does_not_swallow_next_bullet():
+    c = card("## The Star\n- App Pulls: atelier\n- Ray:\n- Crystal: Quartz (SiO2)\n")
+    assert c["ray"] == ""
+    assert c["crystal"] == "Quartz"
+    assert c["chemistry"] == "SiO2"
+
+
+def test_mid_line_keys_still_resolve():
+    c = card("## The Star\n- App Pulls: atelier\n- Notes: see X-Ray: violet\n")
+    assert c["ray"] == "violet"
+
+
+def test_failed_compile_keeps_previous_output(tmp_path):
+    out = tmp_path / "cards.json"
+    out.write_text("[]", encoding="utf-8")
+    bad = tmp_path / "bad.md"
+    bad.write_text("## X\n- App Pulls: a\n- Technical: Solfeggio=1.2.3\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        rc.main(["registry_compile.py", str(bad), str(out)])
+    assert out.read_text(encoding="utf-8") == "[]"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.md", "cards.json"]
+
+
+PARITY_MD = ("## The Star\n- App Pulls: atelier\n- Crystal: Quartz (SiO2)\n"
+             "##\xa0Notes\n- Ray: violet\n"
+             "## Two of Cups\n- App Pulls: game\n- Ray: crimson\n")
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"], ids=["lf", "crlf", "cr"])
+def test_cli_matches_compile_cards(tmp_path, newline):
+    inp = tmp_path / "codex.md"
+    inp.write_bytes(PARITY_MD.replace("\n", newline).encode("utf-8"))
+    out = tmp_path / "cards.json"
+    rc.main(["registry_compile.py", str(inp), str(out)])
+    got = json.loads(out.read_text(encoding="utf-8"))
+    assert got == rc.compile_cards(PARITY_MD)
+    assert [c["ray"] for c in got] == ["", "crimson"]
+
+
+def test_output_mode_kept_for_existing_and_umask_for_new(tmp_path):
+    inp = tmp_path / "codex.md"
+    inp.write_text("## X\n- App Pulls: a\n", encoding="utf-8")
+    out = tmp_path / "cards.json"
+    out.write_text("[]", encoding="utf-8")
+    out.chmod(0o640)
+    rc.main(["registry_compile.py", str(inp), str(out)])
+    assert stat.S_IMODE(out.stat().st_mode) == 0o640
+
+    umask = os.umask(0o022)
+    try:
+        new = tmp_path / "new.json"
+        rc.main(["registry_compile.py", str(inp), str(new)])
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(new.stat().st_mode) == 0o644
@@ -1,19 +1,20 @@
 # Registry Compiler -- Codex Abyssiae -> cards.json
 # Usage: python tools/registry_compile.py [in_md] [out_json]
-import re, json, sys, os
+import re, json, sys, os, functools, secrets, stat
 
-INP = sys.argv[1] if len(sys.argv)>1 else "docs/codex_abyssiae_master.md"
-OUT = sys.argv[2] if len(sys.argv)>2 else "assets/data/cards.json"
+DEFAULT_INP = "docs/codex_abyssiae_master.md"
+DEFAULT_OUT = "assets/data/cards.json"
 
-with open(INP, "r", encoding="utf-8") as f:
-    md = f.read()
-
-blocks = [b for b in re.split(r"\n(?=##\s)", md) if b.startswith("## ")]
+@functools.lru_cache(maxsize=64)
+def _field_re(k):
+    return re.compile(r"-\s*%s:[ \t]*([^\n]*\S)" % re.escape(k))
 
 def field(b, k):
-    m = re.search(r"-\s*%s:\s*([^\n]+)" % re.escape(k), b)
+    m = _field_re(k).search(b)
     return m.group(1).strip() if m else ""
 
+_SLUG_RE = re.compile(r"[^\w]+")
+_SOLFEGGIO_RE = re.compile(r"Solfeggio\s*=\s*([\d.]+)")
 def suit(n):
     s = n.lower()
     if "wands" in s: return "wands"
@@ -22,6 +23,8 @@ def suit(n):
     if "swords" in s or "blade" in s: return "swords"
     return "majors"
 
+_GREEN_RAYS = ("gold","emerald","green","aquamarine","turquoise")
+
 def map_freq(ray):
     """
     Map a textual ray descriptor to a Solfeggio frequency (Hz).
@@ -43,7 +46,7 @@ def map_freq(ray):
     r = (ray or "").lower()
     if "violet" in r: return 963
     if "indigo" in r or "silver" in r: return 852
-    if any(x in r for x in ["gold","emerald","green","aquamarine","turquoise"]): return 528
+    if any(x in r for x in _GREEN_RAYS): return 528
     if "crimson" in r: return 417
     if "scarlet" in r or "red" in r: return 285
     return 432
@@ -67,16 +70,38 @@ def parse_list(value):
     parts = [p.strip() for p in cleaned.split(',')]
     return [p for p in parts if p]
 
-cards = []
-for b in blocks:
-    name_match = re.search(r"^##\s+(.+?)\s*$", b, re.M)
-    if not name_match:
-        continue
-    name = name_match.group(1).strip()
+_BLOCK_RE = re.compile(r"\n(?=##\s)")
+
+def split_blocks(md):
+    """
+    Split markdown into its `## ` heading blocks.
+
+    Parameters:
+        md (str): Full markdown source.
+
+    Returns:
+        list[str]: Blocks that start with "## ", in document order.
+    """
+    return [b for b in _BLOCK_RE.split(md) if b.startswith("## ")]
+
+def _parse_block(b):
+    """
+    Compile a single `## ` block into a card dict.
+
+    Parameters:
+        b (str): A `## ` block of the codex.
+
+    Returns:
+        dict | None: The card, or None when the block has no name or App Pulls.
+    """
+    nl = b.find("\n")
+    name = (b[3:nl] if nl != -1 else b[3:]).strip()
+    if not name:
+        return None
     app_pulls = field(b, "App Pulls")
     if not app_pulls:
-        continue
-    _id = re.sub(r"[^\w]+", "_", name).lower()
+        return None
+    _id = _SLUG_RE.sub("_", name).lower()
     ray = field(b, "Ray")
     ad = field(b, "Angel/Demon")
     angel, demon = "", ""
@@ -85,17 +110,14 @@ for b in blocks:
         angel = parts[0] if parts else ""
         demon = parts[1] if len(parts) > 1 else ""
     crystal_line = field(b, "Crystal")
-    crystal = crystal_line.split("(")[0].strip() if crystal_line else ""
-    chem = ""
-    if crystal_line and "(" in crystal_line and ")" in crystal_line:
-        start = crystal_line.find("(") + 1
-        end = crystal_line.rfind(")")
-        if end > start:
-            chem = crystal_line[start:end].strip()
+    head, _, tail = crystal_line.partition("(")
+    crystal = head.strip()
+    chem_body, close, _ = tail.rpartition(")")
+    chem = chem_body.strip() if close else ""
     tech = field(b, "Technical")
-    freq_match = re.search(r"Solfeggio\s*=\s*([\d\.]+)", tech)
+    freq_match = _SOLFEGGIO_RE.search(tech) if "Solfeggio" in tech else None
     freq = float(freq_match.group(1)) if freq_match else float(map_freq(ray))
-    cards.append({
+    return {
         "id": _id,
         "name": name,
         "suit": suit(name),
@@ -119,9 +141,85 @@ for b in blocks:
         "freq": freq,
         "witchEyeOrders": parse_list(field(b, "Witch Eye Order")),
         "nonLivingLineages": parse_list(field(b, "Non-Living Lineage"))
-    })
+    }
+
+def iter_cards(md):
+    """
+    Yield card dicts compiled from Codex Abyssiae markdown, one per block.
+
+    Only `## ` blocks that carry an `App Pulls:` field become cards.
+
+    Parameters:
+        md (str): Full markdown source.
+
+    Yields:
+        dict: Card records in document order.
+    """
+    for b in split_blocks(md):
+        if "App Pulls:" not in b:
+            continue
+        c = _parse_block(b)
+        if c is not None:
+            yield c
+
+def compile_cards(md):
+    """
+    Compile Codex Abyssiae markdown into a list of card dicts.
+
+    Parameters:
+        md (str): Full markdown source.
+
+    Returns:
+        list[dict]: Card records in document order.
+    """
+    return list(iter_cards(md))
+
+def write_cards(cards, f):
+    """
+    Stream cards to a text file as a JSON array, one card at a time.
+
+    The output is byte-identical to json.dump(..., ensure_ascii=False, indent=2)
+    but never holds more than one serialized card in memory.
+
+    Parameters:
+        cards (Iterable[dict]): Card records to write.
+        f (TextIO): Destination opened for writing.
+
+    Returns:
+        int: Number of cards written.
+    """
+    n = 0
+    f.write("[")
+    for card in cards:
+        body = json.dumps(card, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        f.write(("\n  " if n == 0 else ",\n  ") + body)
+        n += 1
+    f.write("\n]" if n else "]")
+    return n
+
+def main(argv):
+    inp = argv[1] if len(argv)>1 else DEFAULT_INP
+    out = argv[2] if len(argv)>2 else DEFAULT_OUT
+    with open(inp, "r", encoding="utf-8") as f:
+        md = f.read()
+    out_dir = os.path.dirname(out) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    # Stream into a sibling temp file so a parse error never clobbers `out`.
+    # Creating it with 0o666 lets the umask apply as open(out, "w") would.
+    tmp = os.path.join(out_dir, ".cards-%s.json.tmp" % secrets.token_hex(8))
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            try:
+                os.fchmod(f.fileno(), stat.S_IMODE(os.stat(out).st_mode))
+            except FileNotFoundError:
+                pass
+            n = write_cards(iter_cards(md), f)
+        os.replace(tmp, out)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    print(f"Wrote {n} cards -> {out}")
 
-os.makedirs(os.path.dirname(OUT), exist_ok=True)
-with open(OUT, "w", encoding="utf-8") as f:
-    json.dump(cards, f, ensure_ascii=False, indent=2)
-print(f"Wrote {len(cards)} cards -> {OUT}")
+if __name__ == "__main__":
+    main(sys.argv)